@@ -1,17 +1,26 @@
+import io
 import os
+import re
+import time
+import heapq
 import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+from typing import Dict, Any, List, Optional, Final, Literal, Callable, Awaitable, TypeVar
+from collections import deque
+from functools import cached_property, lru_cache
 from dotenv import load_dotenv
+from cachetools import TTLCache
 from telegram import Update
+from telegram.error import TelegramError
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from langgraph.graph import StateGraph, END
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 
-from portfolio_types import AgentState, TelegramMessage, AgentResponse, SentimentIndicator, ActionType
-from tools import CSVPortfolioManager, PortfolioAnalyzer, PortfolioData
+from portfolio_types import AgentState, TelegramMessage, AgentResponse, SentimentIndicator, ActionType, IntentAnalysis
+from tools import CSVPortfolioManager, PortfolioAnalyzer, PortfolioData, PortfolioHolding
+from session_store import SessionStore
 
 # Load environment variables from .env file
 load_dotenv()
@@ -23,24 +32,123 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Static instructions sent as the system prompt ahead of every response request
+SYSTEM_INSTRUCTIONS = """You are PortfolioBuddy, a friendly and knowledgeable investment assistant. You help users understand their portfolio performance and make informed decisions.
+
+Instructions:
+1. Respond in a friendly, conversational tone
+2. Keep responses concise but informative
+3. Use emojis to indicate sentiment (🟢 positive, 🟡 neutral, 🔴 negative)
+4. Use action emojis for recommendations (📈 BUY, 📉 SELL, ⏸️ HOLD, 👀 WATCH)
+5. Focus on the most important information
+6. End with a helpful question or suggestion
+7. Never give financial advice, only provide analysis and information"""
+SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_INSTRUCTIONS)
+
+# Emoji indicators used in response context
+SENTIMENT_EMOJI: Final[Dict[SentimentIndicator, str]] = {
+    SentimentIndicator.POSITIVE: "🟢",
+    SentimentIndicator.NEUTRAL: "🟡",
+    SentimentIndicator.NEGATIVE: "🔴"
+}
+ACTION_EMOJI: Final[Dict[ActionType, str]] = {
+    ActionType.BUY: "📈",
+    ActionType.SELL: "📉",
+    ActionType.HOLD: "⏸️",
+    ActionType.WATCH: "👀"
+}
+
+# Maximum number of messages kept in a user session; older turns are dropped
+MAX_SESSION_MESSAGES = int(os.getenv("MAX_HISTORY", "50"))
+
+T = TypeVar("T")
+
+# Graph routing
+Route = Literal["process_message", "fetch_portfolio", "generate_response"]
+PORTFOLIO_INTENTS: Final = frozenset({"portfolio_query", "stock_analysis"})
+
+# Minimum seconds between Telegram message edits while streaming a reply
+STREAM_EDIT_INTERVAL = 0.5
+
+# Intent classification cache settings
+INTENT_CACHE_MAX_SIZE = 1024
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Fast-path intent patterns, tried before falling back to the LLM
+_GREETING_RE = re.compile(r"^\s*(hi|hello|hey|good (morning|afternoon|evening))\b[\s!.,]*$", re.IGNORECASE)
+_ANALYZE_RE = re.compile(r"^\s*(?i:analy[sz]e)\s+\$?([A-Z]{1,5})\s*[?.!]*$")
+_PORTFOLIO_RE = re.compile(r"\bportfolio\b", re.IGNORECASE)
+_SYMBOL_RE = re.compile(r"\b[A-Z]{1,5}\b")
+_NON_SYMBOL_WORDS = frozenset({"I", "A"})
+
+def _classify_fast(message: str) -> Optional[Dict[str, Any]]:
+    """Classify unambiguous messages locally; return None when the LLM is needed"""
+    if _GREETING_RE.match(message):
+        return {"intent": "greeting", "symbols": [], "requires_portfolio": False}
+    
+    match = _ANALYZE_RE.match(message)
+    if match:
+        return {"intent": "stock_analysis", "symbols": [match.group(1)], "requires_portfolio": True}
+    
+    if _PORTFOLIO_RE.search(message):
+        # Only take the shortcut when no ticker-like words need extracting
+        if not any(word not in _NON_SYMBOL_WORDS for word in _SYMBOL_RE.findall(message)):
+            return {"intent": "portfolio_query", "symbols": [], "requires_portfolio": True}
+    
+    return None
+
+def _gain_loss_percent(holding: PortfolioHolding) -> float:
+    """Sort key for holdings; holdings without market data count as 0%"""
+    return holding.gain_loss_percent or 0.0
+
+def _intent_cache_key(message: str) -> str:
+    """Normalize a user message and hash it into an intent cache key"""
+    normalized = _WHITESPACE_RE.sub(" ", _PUNCTUATION_RE.sub("", message.lower())).strip()
+    return _digest(normalized)
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+@lru_cache(maxsize=1)
+def get_llm() -> ChatGoogleGenerativeAI:
+    """Shared Gemini client, created on first use"""
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash-lite",
+        google_api_key=os.getenv("GEMINI_API_KEY"),
+        temperature=0.3
+    )
+
 class PortfolioBuddyAgent:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-lite",
-            google_api_key=os.getenv("GEMINI_API_KEY"),
-            temperature=0.3
-        )
-        
         # Initialize tools
         self.csv_manager = CSVPortfolioManager()
         self.portfolio_analyzer = PortfolioAnalyzer()
         
-        # User sessions storage (in production, use a proper database)
-        self.user_sessions: Dict[int, AgentState] = {}
+        # User sessions storage, expired after a day of inactivity
+        self.sessions = SessionStore()
+        
+        # Market-priced portfolios keyed by (CSV mtime, minute), shared read-only across users
+        self._portfolio_cache: TTLCache = TTLCache(maxsize=8, ttl=60)
+        
+        # Parsed intent analyses keyed by normalized message hash
+        self._intent_cache: Dict[str, Dict[str, Any]] = {}
+        
+        # LLM calls currently in flight, so identical concurrent requests share one call
+        self._inflight: Dict[str, asyncio.Future] = {}
         
         # Build LangGraph
         self.graph = self._build_graph()
     
+    @cached_property
+    def llm(self) -> ChatGoogleGenerativeAI:
+        return get_llm()
+    
+    @cached_property
+    def intent_llm(self):
+        """Schema-constrained client for intent classification"""
+        return self.llm.with_structured_output(IntentAnalysis)
+    
     def _build_graph(self) -> StateGraph:
         workflow = StateGraph(AgentState)
         
@@ -51,7 +159,14 @@ class PortfolioBuddyAgent:
         workflow.add_node("generate_response", self._generate_response)
         
         # Add edges
-        workflow.set_entry_point("process_message")
+        workflow.set_conditional_entry_point(
+            self._route_entry,
+            {
+                "process_message": "process_message",
+                "fetch_portfolio": "fetch_portfolio",
+                "generate_response": "generate_response"
+            }
+        )
         workflow.add_conditional_edges(
             "process_message",
             self._should_fetch_portfolio,
@@ -71,6 +186,15 @@ class PortfolioBuddyAgent:
         """Process the incoming user message and determine intent"""
         latest_message = state["messages"][-1]["content"]
         
+        # Serve trivially classifiable and repeated messages without calling the LLM
+        cache_key = _intent_cache_key(latest_message)
+        cached = _classify_fast(latest_message) or self._intent_cache.get(cache_key)
+        if cached is not None:
+            state["user_context"]["intent"] = cached["intent"]
+            state["user_context"]["symbols"] = list(cached["symbols"])
+            state["user_context"]["requires_portfolio"] = cached["requires_portfolio"]
+            return state
+        
         # Use LLM to classify the message intent
         prompt = f"""
         Analyze this user message about their investment portfolio:
@@ -83,48 +207,43 @@ class PortfolioBuddyAgent:
         4. "greeting" - Simple greeting
         
         Also extract any stock symbols mentioned (format: AAPL, GOOGL, etc.)
-        
-        Respond in JSON format:
-        {{
-            "intent": "intent_type",
-            "symbols": ["SYMBOL1", "SYMBOL2"],
-            "requires_portfolio": true/false
-        }}
         """
         
         try:
-            response = await self.llm.ainvoke([HumanMessage(content=prompt)])
-            
-            import json
-            import re
+            analysis = await self._single_flight(
+                f"intent:{cache_key}",
+                lambda: self.intent_llm.ainvoke([HumanMessage(content=prompt)])
+            )
             
-            # Extract JSON from response (handle cases where LLM adds extra text)
-            content = response.content.strip()
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                analysis = json.loads(json_str)
-            else:
-                # Fallback: try parsing the entire response as JSON
-                analysis = json.loads(content)
+            state["user_context"]["intent"] = analysis.intent
+            state["user_context"]["symbols"] = list(analysis.symbols)
+            state["user_context"]["requires_portfolio"] = analysis.requires_portfolio
             
-            state["user_context"]["intent"] = analysis.get("intent", "general_question")
-            state["user_context"]["symbols"] = analysis.get("symbols", [])
-            state["user_context"]["requires_portfolio"] = analysis.get("requires_portfolio", False)
+            if len(self._intent_cache) >= INTENT_CACHE_MAX_SIZE:
+                # Evict the oldest entry (dicts preserve insertion order)
+                del self._intent_cache[next(iter(self._intent_cache))]
+            self._intent_cache[cache_key] = analysis.model_dump()
             
         except Exception as e:
-            logger.error(f"Error processing message: {e}")
+            logger.error("Error processing message: %s", e)
             state["user_context"]["intent"] = "general_question"
             state["user_context"]["symbols"] = []
             state["user_context"]["requires_portfolio"] = False
         
         return state
     
-    def _should_fetch_portfolio(self, state: AgentState) -> str:
+    def _route_entry(self, state: AgentState) -> Route:
+        """Skip intent classification when a command has already set the intent"""
+        if state["user_context"].get("preclassified", False):
+            return self._should_fetch_portfolio(state)
+        return "process_message"
+    
+    def _should_fetch_portfolio(self, state: AgentState) -> Route:
         """Determine if we need to fetch portfolio data"""
-        if state["user_context"].get("requires_portfolio", False):
+        user_context = state["user_context"]
+        if user_context.get("requires_portfolio", False):
             return "fetch_portfolio"
-        elif state["user_context"].get("intent") in ["portfolio_query", "stock_analysis"]:
+        elif user_context.get("intent") in PORTFOLIO_INTENTS:
             return "fetch_portfolio"
         else:
             return "generate_response"
@@ -132,14 +251,22 @@ class PortfolioBuddyAgent:
     async def _fetch_portfolio(self, state: AgentState) -> AgentState:
         """Fetch portfolio data from CSV file"""
         try:
-            portfolio = self.csv_manager.get_portfolio_data()
-            # Update with current market data
-            portfolio = self.portfolio_analyzer.update_portfolio_with_market_data(portfolio)
+            # Reuse the portfolio fetched within the same minute for an unchanged CSV
+            cache_key = (self.csv_manager.mtime(), int(time.time() // 60))
+            portfolio = self._portfolio_cache.get(cache_key)
+            if portfolio is None:
+                # Run blocking file and network I/O off the event loop
+                portfolio = await asyncio.to_thread(self.csv_manager.get_portfolio_data)
+                # Update with current market data
+                portfolio = await asyncio.to_thread(self.portfolio_analyzer.update_portfolio_with_market_data, portfolio)
+                # Index holdings once so later nodes can look them up by symbol
+                portfolio["holdings_index"] = {h.symbol: h for h in portfolio["holdings"]}
+                self._portfolio_cache[cache_key] = portfolio
             
             state["portfolio_data"] = portfolio
             
         except Exception as e:
-            logger.error(f"Error fetching portfolio: {e}")
+            logger.error("Error fetching portfolio: %s", e)
             state["portfolio_data"] = None
         
         return state
@@ -153,23 +280,36 @@ class PortfolioBuddyAgent:
             portfolio = state["portfolio_data"]
             symbols_to_analyze = state["user_context"].get("symbols", [])
             
-            # If no specific symbols mentioned, analyze all holdings
+            # If no specific symbols mentioned, analyze all holdings; news for strong movers can be skipped
+            require_news = bool(symbols_to_analyze)
             if not symbols_to_analyze:
-                symbols_to_analyze = [holding["symbol"] for holding in portfolio["holdings"]]
+                symbols_to_analyze = [holding.symbol for holding in portfolio["holdings"]]
+            
+            # Analyze symbols concurrently; each analysis is dominated by network I/O
+            holdings_index = portfolio.get("holdings_index")
+            if holdings_index is None:
+                holdings_index = {h.symbol: h for h in portfolio["holdings"]}
+            results = await asyncio.gather(
+                *(
+                    self.portfolio_analyzer.analyze_symbol(symbol, holdings_index.get(symbol), require_news)
+                    for symbol in symbols_to_analyze
+                ),
+                return_exceptions=True
+            )
             
             analyses = []
-            for symbol in symbols_to_analyze:
-                # Find the holding if it exists
-                holding = next((h for h in portfolio["holdings"] if h["symbol"] == symbol), None)
-                analysis = self.portfolio_analyzer.analyze_symbol(symbol, holding)
-                analyses.append(analysis)
+            for symbol, result in zip(symbols_to_analyze, results):
+                if isinstance(result, Exception):
+                    logger.error("Error analyzing %s: %s", symbol, result)
+                    continue
+                analyses.append(result)
             
             if analyses:
                 state["current_analysis"] = analyses[0]  # Primary analysis
                 state["user_context"]["all_analyses"] = analyses
             
         except Exception as e:
-            logger.error(f"Error analyzing portfolio: {e}")
+            logger.error("Error analyzing portfolio: %s", e)
             state["current_analysis"] = None
         
         return state
@@ -181,115 +321,130 @@ class PortfolioBuddyAgent:
             intent = state["user_context"].get("intent", "general_question")
             
             # Build context for the LLM
-            context_parts = []
+            buf = io.StringIO()
             
             # Add portfolio context if available
             if state["portfolio_data"]:
                 portfolio = state["portfolio_data"]
-                context_parts.append(f"""
+                buf.write(f"""
                 Portfolio Summary:
                 - Total Value: ${portfolio['total_value']:,.2f}
                 - Total Gain/Loss: ${portfolio['total_gain_loss']:,.2f} ({portfolio['total_gain_loss_percent']:.1f}%)
                 - Holdings: {len(portfolio['holdings'])} stocks
-                """)
+                \n""")
                 
                 # Add top performers
                 if portfolio["holdings"]:
-                    top_performers = sorted(portfolio["holdings"], key=lambda x: x.get("gain_loss_percent", 0), reverse=True)[:3]
-                    worst_performers = sorted(portfolio["holdings"], key=lambda x: x.get("gain_loss_percent", 0))[:3]
-                    
-                    context_parts.append("Top Performers:")
-                    for holding in top_performers:
-                        context_parts.append(f"- {holding['symbol']}: {holding.get('gain_loss_percent', 0):.1f}%")
+                    top_performers = heapq.nlargest(3, portfolio["holdings"], key=_gain_loss_percent)
+                    worst_performers = heapq.nsmallest(3, portfolio["holdings"], key=_gain_loss_percent)
                     
-                    context_parts.append("Worst Performers:")
-                    for holding in worst_performers:
-                        context_parts.append(f"- {holding['symbol']}: {holding.get('gain_loss_percent', 0):.1f}%")
+                    buf.write("Top Performers:\n")
+                    buf.write("".join(f"- {h.symbol}: {_gain_loss_percent(h):.1f}%\n" for h in top_performers))
+                    buf.write("Worst Performers:\n")
+                    buf.write("".join(f"- {h.symbol}: {_gain_loss_percent(h):.1f}%\n" for h in worst_performers))
             
             # Add analysis context if available
             if state["current_analysis"]:
                 analysis = state["current_analysis"]
-                sentiment_emoji = {
-                    SentimentIndicator.POSITIVE: "🟢",
-                    SentimentIndicator.NEUTRAL: "🟡", 
-                    SentimentIndicator.NEGATIVE: "🔴"
-                }
-                
-                action_emoji = {
-                    ActionType.BUY: "📈",
-                    ActionType.SELL: "📉",
-                    ActionType.HOLD: "⏸️",
-                    ActionType.WATCH: "👀"
-                }
-                
-                context_parts.append(f"""
+                buf.write(f"""
                 Analysis for {analysis['symbol']}:
                 - Current Price: ${analysis['current_price']:.2f}
-                - Sentiment: {sentiment_emoji[analysis['sentiment']]} {analysis['sentiment'].value}
-                - Recommendation: {action_emoji[analysis['recommendation']]} {analysis['recommendation'].value.upper()}
+                - Sentiment: {SENTIMENT_EMOJI[analysis['sentiment']]} {analysis['sentiment']}
+                - Recommendation: {ACTION_EMOJI[analysis['recommendation']]} {analysis['recommendation'].upper()}
                 - Confidence: {analysis['confidence']:.1%}
                 - Reasoning: {analysis['reasoning']}
-                """)
+                \n""")
                 
                 if analysis['news_summary']:
-                    context_parts.append("Recent News:")
-                    for news in analysis['news_summary'][:2]:
-                        context_parts.append(f"- {news['title']}")
+                    buf.write("Recent News:\n")
+                    buf.write("".join(f"- {news['title']}\n" for news in analysis['news_summary'][:2]))
             
             # Create the prompt
-            context = "\n".join(context_parts)
+            context = buf.getvalue()
             
             prompt = f"""
-            You are PortfolioBuddy, a friendly and knowledgeable investment assistant. You help users understand their portfolio performance and make informed decisions.
-
             User Message: "{latest_message}"
             User Intent: {intent}
 
             {context if context else "No portfolio data available."}
 
-            Instructions:
-            1. Respond in a friendly, conversational tone
-            2. Keep responses concise but informative
-            3. Use emojis to indicate sentiment (🟢 positive, 🟡 neutral, 🔴 negative)
-            4. Use action emojis for recommendations (📈 BUY, 📉 SELL, ⏸️ HOLD, 👀 WATCH)
-            5. Focus on the most important information
-            6. End with a helpful question or suggestion
-            7. Never give financial advice, only provide analysis and information
-
             Response:
             """
             
-            response = await self.llm.ainvoke([HumanMessage(content=prompt)])
+            content = await self._single_flight(
+                f"response:{_digest(prompt)}",
+                lambda: self._stream_response(prompt)
+            )
             
             # Add the AI response to messages
             state["messages"].append({
                 "role": "assistant",
-                "content": response.content,
-                "timestamp": datetime.now()
+                "content": content,
+                "timestamp": time.time_ns()
             })
             
         except Exception as e:
-            logger.error(f"Error generating response: {e}")
+            logger.error("Error generating response: %s", e)
             error_response = "Sorry, I encountered an error processing your request. Please try again."
             state["messages"].append({
                 "role": "assistant", 
                 "content": error_response,
-                "timestamp": datetime.now()
+                "timestamp": time.time_ns()
             })
         
         return state
     
+    async def _stream_response(self, prompt: str) -> str:
+        """Stream the response so callers can relay tokens as they arrive"""
+        content = ""
+        async for chunk in self.llm.astream([SYSTEM_MESSAGE, HumanMessage(content=prompt)]):
+            content += chunk.content
+        return content
+    
+    async def _single_flight(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Run call once per key; concurrent callers with the same key await the same result"""
+        future = self._inflight.get(key)
+        while future is not None and not future.cancelled():
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Only propagate our own cancellation; if the leader was cancelled, take over the call
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+            future = self._inflight.get(key)
+        
+        # No await between the lookup and registration, so this is race-free on the event loop
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved in case no other caller is waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+    
     def get_or_create_session(self, user_id: int) -> AgentState:
         """Get or create a user session"""
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = {
-                "messages": [],
+        session = self.sessions.get(user_id)
+        if session is None:
+            session = {
+                "messages": deque(maxlen=MAX_SESSION_MESSAGES),
                 "portfolio_data": None,
                 "current_analysis": None,
                 "user_context": {},
                 "last_action": None
             }
-        return self.user_sessions[user_id]
+            self.sessions.put(user_id, session)
+        return session
     
     async def process_telegram_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Process incoming Telegram message"""
@@ -303,25 +458,58 @@ class PortfolioBuddyAgent:
         session["messages"].append({
             "role": "user",
             "content": message_text,
-            "timestamp": datetime.now()
+            "timestamp": time.time_ns()
         })
+        session["user_context"]["preclassified"] = False
+        
+        await self._run_graph(update, user_id, session)
+    
+    async def _run_graph(self, update: Update, user_id: int, session: AgentState) -> None:
+        """Run the session through the graph and stream the reply to the user"""
+        # Placeholder reply that is edited as the response streams in
+        reply = await update.message.reply_text("…")
         
         try:
-            # Process through LangGraph
-            result = await self.graph.ainvoke(session)
+            # Process through LangGraph, relaying response tokens as they arrive
+            result = session
+            streamed_text = ""
+            shown_text = ""
+            last_edit = 0.0
+            loop = asyncio.get_running_loop()
+            async for mode, payload in self.graph.astream(session, stream_mode=["messages", "values"]):
+                if mode == "values":
+                    result = payload
+                    continue
+                
+                chunk, metadata = payload
+                if metadata.get("langgraph_node") != "generate_response":
+                    continue
+                streamed_text += chunk.content
+                
+                # Throttle edits to stay within Telegram rate limits
+                now = loop.time()
+                if streamed_text.strip() and now - last_edit >= STREAM_EDIT_INTERVAL:
+                    last_edit = now
+                    try:
+                        await reply.edit_text(streamed_text)
+                        shown_text = streamed_text
+                    except TelegramError as e:
+                        # A skipped intermediate edit (e.g. flood control) is caught up by the next one
+                        logger.warning("Error streaming reply edit: %s", e)
             
             # Update session with result
-            self.user_sessions[user_id] = result
+            self.sessions.put(user_id, result)
             
-            # Send the latest AI response back to user
+            # Send the final AI response back to user
             if result["messages"]:
                 latest_message = result["messages"][-1]
-                if latest_message["role"] == "assistant":
-                    await update.message.reply_text(latest_message["content"])
+                # Telegram trims messages before comparing, so an edit differing only in whitespace is rejected
+                if latest_message["role"] == "assistant" and latest_message["content"].strip() != shown_text.strip():
+                    await reply.edit_text(latest_message["content"])
         
         except Exception as e:
-            logger.error(f"Error processing message: {e}")
-            await update.message.reply_text("Sorry, I encountered an error. Please try again.")
+            logger.error("Error processing message: %s", e)
+            await reply.edit_text("Sorry, I encountered an error. Please try again.")
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /start command"""
@@ -358,11 +546,19 @@ class PortfolioBuddyAgent:
         session["messages"].append({
             "role": "user",
             "content": "Show me my portfolio summary",
-            "timestamp": datetime.now()
+            "timestamp": time.time_ns()
+        })
+        
+        # The intent is known, so skip classification
+        session["user_context"].update({
+            "intent": "portfolio_query",
+            "symbols": [],
+            "requires_portfolio": True,
+            "preclassified": True
         })
         
         # Process through the graph
-        await self.process_telegram_message(update, context)
+        await self._run_graph(update, user_id, session)
     
     async def analyze_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /analyze command"""
@@ -379,11 +575,19 @@ class PortfolioBuddyAgent:
         session["messages"].append({
             "role": "user",
             "content": f"Analyze {symbol}",
-            "timestamp": datetime.now()
+            "timestamp": time.time_ns()
+        })
+        
+        # The intent is known, so skip classification
+        session["user_context"].update({
+            "intent": "stock_analysis",
+            "symbols": [symbol],
+            "requires_portfolio": True,
+            "preclassified": True
         })
         
         # Process through the graph
-        await self.process_telegram_message(update, context)
+        await self._run_graph(update, user_id, session)
 
 def run_bot():
     """Run the Telegram bot"""
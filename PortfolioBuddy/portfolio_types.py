@@ -1,26 +1,29 @@
-from typing import TypedDict, List, Optional, Dict, Any
+from typing import TypedDict, List, Optional, Dict, Any, Literal, NotRequired, Deque
 from datetime import datetime
-from enum import Enum
+from dataclasses import dataclass
+from enum import StrEnum
+from pydantic import BaseModel, Field
 
-class SentimentIndicator(Enum):
+class SentimentIndicator(StrEnum):
     POSITIVE = "positive"
     NEUTRAL = "neutral"
     NEGATIVE = "negative"
 
-class ActionType(Enum):
+class ActionType(StrEnum):
     BUY = "buy"
     SELL = "sell"
     HOLD = "hold"
     WATCH = "watch"
 
-class PortfolioHolding(TypedDict):
+@dataclass(slots=True)
+class PortfolioHolding:
     symbol: str
     quantity: float
     avg_cost: float
-    current_price: Optional[float]
-    value: Optional[float]
-    gain_loss: Optional[float]
-    gain_loss_percent: Optional[float]
+    current_price: Optional[float] = None
+    value: Optional[float] = None
+    gain_loss: Optional[float] = None
+    gain_loss_percent: Optional[float] = None
 
 class PortfolioData(TypedDict):
     holdings: List[PortfolioHolding]
@@ -28,6 +31,7 @@ class PortfolioData(TypedDict):
     total_gain_loss: Optional[float]
     total_gain_loss_percent: Optional[float]
     last_updated: Optional[datetime]
+    holdings_index: NotRequired[Dict[str, PortfolioHolding]]
 
 class NewsItem(TypedDict):
     title: str
@@ -59,19 +63,30 @@ class AnalysisResult(TypedDict):
     confidence: float
     reasoning: str
 
+class ChatMessage(TypedDict):
+    role: Literal["user", "assistant"]
+    content: str
+    timestamp: int  # Epoch nanoseconds (time.time_ns())
+
 class AgentState(TypedDict):
-    messages: List[Dict[str, Any]]
+    messages: Deque[ChatMessage]
     portfolio_data: Optional[PortfolioData]
     current_analysis: Optional[AnalysisResult]
     user_context: Dict[str, Any]
     last_action: Optional[str]
 
+class IntentAnalysis(BaseModel):
+    """Structured output schema for user message intent classification"""
+    intent: Literal["portfolio_query", "stock_analysis", "general_question", "greeting"]
+    symbols: List[str] = Field(default_factory=list, description="Stock symbols mentioned, e.g. AAPL")
+    requires_portfolio: bool = False
+
 class TelegramMessage(TypedDict):
     message_id: int
     user_id: int
     username: str
     text: str
-    timestamp: datetime
+    timestamp: int  # Epoch nanoseconds (time.time_ns())
 
 class AgentResponse(TypedDict):
     text: str
@@ -0,0 +1,19 @@
+from typing import Optional
+from cachetools import TTLCache
+
+from portfolio_types import AgentState
+
+class SessionStore:
+    """In-memory user session store with TTL expiry and LRU eviction"""
+    
+    def __init__(self, maxsize: int = 10_000, ttl: float = 86400):
+        self._sessions: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+    
+    def get(self, user_id: int) -> Optional[AgentState]:
+        return self._sessions.get(user_id)
+    
+    def put(self, user_id: int, state: AgentState) -> None:
+        self._sessions[user_id] = state
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
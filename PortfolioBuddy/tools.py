@@ -1,23 +1,89 @@
 import os
-import csv
-import requests
-from typing import List, Dict, Any, Optional
+import math
+import re
+import threading
+import asyncio
+import httpx
+import orjson
+import numpy as np
+import pandas as pd
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import replace
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import yfinance as yf
-from textblob import TextBlob
+from cachetools import TTLCache
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+try:
+    import ciso8601
+except ImportError:  # Optional C-accelerated ISO 8601 parser
+    ciso8601 = None
 
 from portfolio_types import (
     PortfolioData, PortfolioHolding, MarketData, NewsItem, 
     SentimentIndicator, AnalysisResult, ActionType
 )
 
+# Cache lifetimes in seconds, matched to how often the underlying data changes
+QUOTE_CACHE_TTL = 60
+NEWS_CACHE_TTL = 60 * 60
+PE_RATIO_CACHE_TTL = 30 * 24 * 60 * 60
+
+# Shared lexicon-based sentiment scorer, loaded once at import
+_SENTIMENT_ANALYZER = SentimentIntensityAnalyzer()
+
+@lru_cache(maxsize=4096)
+def _polarity(text: str) -> float:
+    """Compound sentiment score, memoized since the same headlines recur across fetches"""
+    return _SENTIMENT_ANALYZER.polarity_scores(text)['compound']
+
+# Recommendation thresholds: daily price move (%), VADER compound score, position gain/loss (%)
+STRONG_MOVE_PERCENT = 5
+SENTIMENT_THRESHOLD = 0.05
+LARGE_POSITION_GAIN_LOSS_PERCENT = 20
+
+# Financial keywords that mark an article as market-relevant
+_FINANCIAL_KEYWORDS_RE = re.compile(
+    "|".join(('stock', 'share', 'trading', 'market', 'price', 'investment', 'portfolio')),
+    re.IGNORECASE
+)
+
+# Shared worker pool for concurrent Yahoo Finance requests
+_MARKET_DATA_POOL = ThreadPoolExecutor(max_workers=10, thread_name_prefix="yfinance_pool")
+
+# NewsAPI retry policy for rate limiting and transient server errors
+NEWS_API_RETRIES = 3
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+_EPOCH_TIMESTAMP = '1970-01-01T00:00:00Z'
+
+def _parse_timestamp(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp, using the ciso8601 C parser when installed"""
+    if ciso8601 is not None:
+        return ciso8601.parse_datetime(value)
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
 class CSVPortfolioManager:
     def __init__(self, csv_file_path: str = None):
         self.csv_file_path = csv_file_path or os.getenv('PORTFOLIO_CSV_PATH', 'portfolio.csv')
+        # Parsed holdings from the last read, keyed by the file's modification time
+        self._holdings_cache: Optional[Tuple[float, List[PortfolioHolding]]] = None
+    
+    def mtime(self) -> Optional[float]:
+        """Modification time of the CSV file, or None if it does not exist"""
+        try:
+            return os.path.getmtime(self.csv_file_path)
+        except OSError:
+            return None
     
     def get_portfolio_data(self) -> PortfolioData:
         try:
-            if not os.path.exists(self.csv_file_path):
+            mtime = self.mtime()
+            if mtime is None:
                 print(f"Portfolio CSV file not found: {self.csv_file_path}")
                 return PortfolioData(
                     holdings=[],
@@ -27,31 +93,14 @@ class CSVPortfolioManager:
                     last_updated=datetime.now()
                 )
             
-            holdings = []
+            # Only re-parse the file when it has changed since the last read
+            cached = self._holdings_cache
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, self._read_holdings())
+                self._holdings_cache = cached
             
-            with open(self.csv_file_path, 'r', newline='', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                
-                for row in reader:
-                    try:
-                        # Skip empty rows
-                        if not row.get('Symbol', '').strip():
-                            continue
-                        
-                        holding = PortfolioHolding(
-                            symbol=row['Symbol'].upper().strip(),
-                            quantity=float(row['Quantity']),
-                            avg_cost=float(row['Average Cost']),
-                            current_price=None,
-                            value=None,
-                            gain_loss=None,
-                            gain_loss_percent=None
-                        )
-                        holdings.append(holding)
-                        
-                    except (ValueError, KeyError) as e:
-                        print(f"Error parsing row {row}: {e}")
-                        continue
+            # Hand out copies since holdings are updated in place with market data
+            holdings = [replace(holding) for holding in cached[1]]
             
             return PortfolioData(
                 holdings=holdings,
@@ -70,19 +119,100 @@ class CSVPortfolioManager:
                 total_gain_loss_percent=0.0,
                 last_updated=datetime.now()
             )
+    
+    def _read_holdings(self) -> List[PortfolioHolding]:
+        df = pd.read_csv(
+            self.csv_file_path,
+            usecols=['Symbol', 'Quantity', 'Average Cost'],
+            dtype='string',
+            engine='c'
+        )
+        
+        # Coerce numbers column-wise; malformed values become NaN instead of raising per row
+        df['Symbol'] = df['Symbol'].str.strip().str.upper().replace('', pd.NA)
+        df['Quantity'] = pd.to_numeric(df['Quantity'], errors='coerce').astype('float64')
+        df['Average Cost'] = pd.to_numeric(df['Average Cost'], errors='coerce').astype('float64')
+        
+        # Skip empty rows silently, but report rows that were dropped as malformed
+        df = df.dropna(how='all')
+        valid = df.dropna(subset=['Symbol', 'Quantity', 'Average Cost'])
+        if len(valid) < len(df):
+            print(f"Skipped {len(df) - len(valid)} malformed portfolio CSV row(s)")
+        
+        return [
+            PortfolioHolding(symbol=symbol, quantity=quantity, avg_cost=avg_cost)
+            for symbol, quantity, avg_cost in zip(
+                valid['Symbol'].tolist(), valid['Quantity'].tolist(), valid['Average Cost'].tolist()
+            )
+        ]
 
 class YahooFinanceManager:
+    def __init__(self):
+        # Recent full quotes from single-symbol lookups
+        self._quote_cache: TTLCache = TTLCache(maxsize=512, ttl=QUOTE_CACHE_TTL)
+        # Recent price-only quotes from batch downloads, which lack market cap and P/E
+        self._price_cache: TTLCache = TTLCache(maxsize=512, ttl=QUOTE_CACHE_TTL)
+        self._pe_ratio_cache: TTLCache = TTLCache(maxsize=512, ttl=PE_RATIO_CACHE_TTL)
+        self._cache_lock = threading.Lock()
+        self._fetch_guards: Dict[str, threading.Lock] = {}
+        self._fetch_waiters: Counter = Counter()
+    
+    def _cached_quote(self, symbol: str) -> Optional[MarketData]:
+        with self._cache_lock:
+            return self._quote_cache.get(symbol)
+    
+    def _cache_quote(self, symbol: str, market_data: MarketData) -> None:
+        with self._cache_lock:
+            self._quote_cache[symbol] = market_data
+    
+    def _cached_price(self, symbol: str) -> Optional[MarketData]:
+        # Either a full quote or a batch price row is good enough for pricing holdings
+        with self._cache_lock:
+            return self._quote_cache.get(symbol) or self._price_cache.get(symbol)
+    
+    @contextmanager
+    def _fetch_guard(self, symbol: str):
+        """Hold the symbol's fetch lock, dropping it once no thread holds or waits on it"""
+        with self._cache_lock:
+            guard = self._fetch_guards.get(symbol)
+            if guard is None:
+                guard = self._fetch_guards[symbol] = threading.Lock()
+            self._fetch_waiters[symbol] += 1
+        try:
+            with guard:
+                yield
+        finally:
+            with self._cache_lock:
+                self._fetch_waiters[symbol] -= 1
+                if not self._fetch_waiters[symbol]:
+                    del self._fetch_waiters[symbol]
+                    del self._fetch_guards[symbol]
+    
     def get_market_data(self, symbol: str) -> Optional[MarketData]:
+        market_data = self._cached_quote(symbol)
+        if market_data is not None:
+            return market_data
+        
+        # Let one thread fetch a missing quote while concurrent callers wait for its result
+        with self._fetch_guard(symbol):
+            market_data = self._cached_quote(symbol)
+            if market_data is None:
+                market_data = self._fetch_market_data(symbol)
+                if market_data:
+                    self._cache_quote(symbol, market_data)
+        return market_data
+    
+    def _fetch_market_data(self, symbol: str) -> Optional[MarketData]:
         try:
             ticker = yf.Ticker(symbol)
-            info = ticker.info
-            history = ticker.history(period="1d")
+            # fast_info reads the lightweight quote endpoint instead of scraping the full .info blob
+            fast_info = ticker.fast_info
+            current_price = fast_info.last_price
             
-            if history.empty:
+            if current_price is None or math.isnan(current_price):
                 return None
             
-            current_price = history['Close'].iloc[-1]
-            previous_close = info.get('previousClose', current_price)
+            previous_close = fast_info.previous_close or current_price
             change = current_price - previous_close
             change_percent = (change / previous_close) * 100 if previous_close != 0 else 0
             
@@ -91,33 +221,162 @@ class YahooFinanceManager:
                 price=current_price,
                 change=change,
                 change_percent=change_percent,
-                volume=int(info.get('volume', 0)),
-                market_cap=info.get('marketCap'),
-                pe_ratio=info.get('trailingPE'),
-                day_high=history['High'].iloc[-1],
-                day_low=history['Low'].iloc[-1]
+                volume=int(fast_info.last_volume or 0),
+                market_cap=fast_info.market_cap,
+                pe_ratio=self._get_pe_ratio(symbol, ticker),
+                day_high=fast_info.day_high,
+                day_low=fast_info.day_low
             )
         except Exception as e:
             print(f"Error fetching data for {symbol}: {e}")
             return None
     
+    def _get_pe_ratio(self, symbol: str, ticker: yf.Ticker) -> Optional[float]:
+        # P/E is only available from the heavy .info scrape, so keep it for much longer than quotes
+        with self._cache_lock:
+            if symbol in self._pe_ratio_cache:
+                return self._pe_ratio_cache[symbol]
+        
+        try:
+            pe_ratio = ticker.info.get('trailingPE')
+        except Exception as e:
+            print(f"Error fetching P/E ratio for {symbol}: {e}")
+            return None
+        
+        with self._cache_lock:
+            self._pe_ratio_cache[symbol] = pe_ratio
+        return pe_ratio
+    
     def get_multiple_market_data(self, symbols: List[str]) -> Dict[str, MarketData]:
         data = {}
         for symbol in symbols:
-            market_data = self.get_market_data(symbol)
+            market_data = self._cached_price(symbol)
+            if market_data:
+                data[symbol] = market_data
+        
+        to_fetch = [symbol for symbol in symbols if symbol not in data]
+        if not to_fetch:
+            return data
+        
+        # Fetch recent daily bars for all uncached symbols in one batch request
+        try:
+            history = yf.download(
+                to_fetch, period="5d", group_by="ticker", threads=True, progress=False, auto_adjust=True
+            )
+            for symbol in to_fetch:
+                market_data = self._market_data_from_history(symbol, history)
+                if market_data:
+                    data[symbol] = market_data
+                    with self._cache_lock:
+                        self._price_cache[symbol] = market_data
+        except Exception as e:
+            print(f"Error batch fetching market data: {e}")
+        
+        # Fall back to concurrent per-symbol fetches for anything the batch missed
+        missing = [symbol for symbol in symbols if symbol not in data]
+        for symbol, market_data in zip(missing, _MARKET_DATA_POOL.map(self.get_market_data, missing)):
             if market_data:
                 data[symbol] = market_data
         return data
+    
+    def _market_data_from_history(self, symbol: str, history) -> Optional[MarketData]:
+        try:
+            bars = history[symbol] if history.columns.nlevels > 1 else history
+            bars = bars.dropna(subset=['Close'])
+        except KeyError:
+            return None
+        
+        if len(bars) < 2:
+            return None
+        
+        last_bar = bars.iloc[-1]
+        current_price = float(last_bar['Close'])
+        previous_close = float(bars['Close'].iloc[-2])
+        change = current_price - previous_close
+        change_percent = (change / previous_close) * 100 if previous_close != 0 else 0
+        volume = last_bar['Volume']
+        
+        # Market cap and P/E are not part of the bar data and aren't needed for pricing
+        return MarketData(
+            symbol=symbol.upper(),
+            price=current_price,
+            change=change,
+            change_percent=change_percent,
+            volume=0 if math.isnan(volume) else int(volume),
+            market_cap=None,
+            pe_ratio=None,
+            day_high=float(last_bar['High']),
+            day_low=float(last_bar['Low'])
+        )
 
 class NewsManager:
     def __init__(self, news_api_key: str = None):
         self.api_key = news_api_key or os.getenv('NEWS_API_KEY')
         self.base_url = "https://newsapi.org/v2"
+        self._news_cache: TTLCache = TTLCache(maxsize=256, ttl=NEWS_CACHE_TTL)
+        self._fetch_guards: Dict[Tuple[str, int], asyncio.Lock] = {}
+        self._fetch_waiters: Counter = Counter()
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client, created on first use inside the running event loop"""
+        if self._client is None:
+            # Keep-alive connection pool; the transport retries failed connection attempts
+            self._client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(
+                    retries=3,
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=20)
+                ),
+                headers={'Accept-Encoding': 'gzip, deflate'},
+                timeout=10.0
+            )
+        return self._client
     
-    def get_stock_news(self, symbol: str, days_back: int = 7) -> List[NewsItem]:
+    async def _get_with_retries(self, url: str, params: Dict[str, Any]) -> httpx.Response:
+        # Retry rate-limited and transient server errors with exponential backoff
+        for attempt in range(NEWS_API_RETRIES + 1):
+            response = await self.client.get(url, params=params)
+            if response.status_code not in _RETRY_STATUSES or attempt == NEWS_API_RETRIES:
+                return response
+            await asyncio.sleep(0.3 * 2 ** attempt)
+    
+    @asynccontextmanager
+    async def _fetch_guard(self, key: Tuple[str, int]):
+        """Hold the key's fetch lock, dropping it once no coroutine holds or waits on it"""
+        guard = self._fetch_guards.get(key)
+        if guard is None:
+            guard = self._fetch_guards[key] = asyncio.Lock()
+        self._fetch_waiters[key] += 1
+        try:
+            async with guard:
+                yield
+        finally:
+            self._fetch_waiters[key] -= 1
+            if not self._fetch_waiters[key]:
+                del self._fetch_waiters[key]
+                del self._fetch_guards[key]
+    
+    async def get_stock_news(self, symbol: str, days_back: int = 7) -> List[NewsItem]:
+        key = (symbol, days_back)
+        news_items = self._news_cache.get(key)
+        if news_items is not None:
+            return news_items
+        
+        # Let one coroutine fetch missing news while concurrent callers wait for its result
+        async with self._fetch_guard(key):
+            news_items = self._news_cache.get(key)
+            if news_items is None:
+                news_items = await self._fetch_stock_news(symbol, days_back)
+                # Don't cache empty results, which are usually fetch failures
+                if news_items:
+                    self._news_cache[key] = news_items
+        return news_items
+    
+    async def _fetch_stock_news(self, symbol: str, days_back: int) -> List[NewsItem]:
         if not self.api_key:
             # Fallback to Yahoo Finance news
-            return self._get_yahoo_news(symbol)
+            return await asyncio.to_thread(self._get_yahoo_news, symbol)
         
         try:
             end_date = datetime.now()
@@ -134,22 +393,27 @@ class NewsManager:
                 'apiKey': self.api_key
             }
             
-            response = requests.get(url, params=params)
+            response = await self._get_with_retries(url, params)
             response.raise_for_status()
             
-            articles = response.json().get('articles', [])
+            articles = orjson.loads(response.content).get('articles') or []
             news_items = []
             
             for article in articles:
-                sentiment = self._analyze_sentiment(article.get('title', '') + ' ' + article.get('description', ''))
-                relevance = self._calculate_relevance(article.get('title', '') + ' ' + article.get('description', ''), symbol)
+                title = article.get('title') or ''
+                content = article.get('description') or ''
+                
+                # Build the scored text once and reuse it for both sentiment and relevance
+                text = f"{title} {content}"
+                sentiment = self._analyze_sentiment(text)
+                relevance = self._calculate_relevance(text, symbol)
                 
                 news_items.append(NewsItem(
-                    title=article.get('title', ''),
-                    content=article.get('description', ''),
+                    title=title,
+                    content=content,
                     source=article.get('source', {}).get('name', ''),
                     url=article.get('url', ''),
-                    published_at=datetime.fromisoformat(article.get('publishedAt', '').replace('Z', '+00:00')),
+                    published_at=_parse_timestamp(article.get('publishedAt') or _EPOCH_TIMESTAMP),
                     sentiment=sentiment,
                     relevance_score=relevance
                 ))
@@ -158,7 +422,7 @@ class NewsManager:
             
         except Exception as e:
             print(f"Error fetching news for {symbol}: {e}")
-            return self._get_yahoo_news(symbol)
+            return await asyncio.to_thread(self._get_yahoo_news, symbol)
     
     def _get_yahoo_news(self, symbol: str) -> List[NewsItem]:
         try:
@@ -167,11 +431,12 @@ class NewsManager:
             
             news_items = []
             for item in news[:10]:  # Limit to 10 most recent
-                title = item.get('title', '')
-                content = item.get('summary', '')
+                title = item.get('title') or ''
+                content = item.get('summary') or ''
                 
-                sentiment = self._analyze_sentiment(title + ' ' + content)
-                relevance = self._calculate_relevance(title + ' ' + content, symbol)
+                text = f"{title} {content}"
+                sentiment = self._analyze_sentiment(text)
+                relevance = self._calculate_relevance(text, symbol)
                 
                 news_items.append(NewsItem(
                     title=title,
@@ -191,12 +456,11 @@ class NewsManager:
     
     def _analyze_sentiment(self, text: str) -> SentimentIndicator:
         try:
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
+            polarity = _polarity(text)
             
-            if polarity > 0.1:
+            if polarity >= SENTIMENT_THRESHOLD:
                 return SentimentIndicator.POSITIVE
-            elif polarity < -0.1:
+            elif polarity <= -SENTIMENT_THRESHOLD:
                 return SentimentIndicator.NEGATIVE
             else:
                 return SentimentIndicator.NEUTRAL
@@ -204,15 +468,11 @@ class NewsManager:
             return SentimentIndicator.NEUTRAL
     
     def _calculate_relevance(self, text: str, symbol: str) -> float:
-        text_lower = text.lower()
-        symbol_lower = symbol.lower()
+        # Count case-insensitive mentions of the symbol
+        symbol_count = len(re.findall(re.escape(symbol), text, re.IGNORECASE))
         
-        # Count mentions of the symbol
-        symbol_count = text_lower.count(symbol_lower)
-        
-        # Look for financial keywords
-        financial_keywords = ['stock', 'share', 'trading', 'market', 'price', 'investment', 'portfolio']
-        keyword_count = sum(1 for keyword in financial_keywords if keyword in text_lower)
+        # Look for financial keywords in a single pass, counting each keyword once
+        keyword_count = len({match.lower() for match in _FINANCIAL_KEYWORDS_RE.findall(text)})
         
         # Calculate relevance score
         relevance = (symbol_count * 0.6) + (keyword_count * 0.4)
@@ -223,9 +483,14 @@ class PortfolioAnalyzer:
         self.yahoo_manager = YahooFinanceManager()
         self.news_manager = NewsManager()
     
-    def analyze_symbol(self, symbol: str, holding: Optional[PortfolioHolding] = None) -> AnalysisResult:
+    async def analyze_symbol(
+        self,
+        symbol: str,
+        holding: Optional[PortfolioHolding] = None,
+        require_news: bool = True
+    ) -> AnalysisResult:
         # Get market data
-        market_data = self.yahoo_manager.get_market_data(symbol)
+        market_data = await asyncio.to_thread(self.yahoo_manager.get_market_data, symbol)
         if not market_data:
             return AnalysisResult(
                 symbol=symbol,
@@ -238,13 +503,17 @@ class PortfolioAnalyzer:
                 reasoning="Unable to fetch market data"
             )
         
-        # Get news
-        news_items = self.news_manager.get_stock_news(symbol)
+        # Get news, unless the caller allows skipping it and the price move alone drives the recommendation
+        if require_news or abs(market_data['change_percent']) <= STRONG_MOVE_PERCENT:
+            news_items = await self.news_manager.get_stock_news(symbol)
+        else:
+            news_items = []
         
         # Analyze sentiment
         if news_items:
-            positive_count = sum(1 for item in news_items if item['sentiment'] == SentimentIndicator.POSITIVE)
-            negative_count = sum(1 for item in news_items if item['sentiment'] == SentimentIndicator.NEGATIVE)
+            sentiment_counts = Counter(item['sentiment'] for item in news_items)
+            positive_count = sentiment_counts[SentimentIndicator.POSITIVE]
+            negative_count = sentiment_counts[SentimentIndicator.NEGATIVE]
             
             if positive_count > negative_count:
                 overall_sentiment = SentimentIndicator.POSITIVE
@@ -287,11 +556,11 @@ class PortfolioAnalyzer:
         reasoning_parts = []
         
         # Base recommendation on price change
-        if change_percent > 5:
+        if change_percent > STRONG_MOVE_PERCENT:
             base_action = ActionType.BUY
             base_confidence = 0.7
             reasoning_parts.append(f"Price is up {change_percent:.1f}%")
-        elif change_percent < -5:
+        elif change_percent < -STRONG_MOVE_PERCENT:
             base_action = ActionType.SELL
             base_confidence = 0.7
             reasoning_parts.append(f"Price is down {abs(change_percent):.1f}%")
@@ -301,30 +570,30 @@ class PortfolioAnalyzer:
             reasoning_parts.append("Price is relatively stable")
         
         # Adjust based on sentiment
-        if sentiment == SentimentIndicator.POSITIVE:
-            if base_action == ActionType.BUY:
+        if sentiment is SentimentIndicator.POSITIVE:
+            if base_action is ActionType.BUY:
                 base_confidence = min(base_confidence + 0.2, 1.0)
-            elif base_action == ActionType.SELL:
+            elif base_action is ActionType.SELL:
                 base_confidence = max(base_confidence - 0.2, 0.1)
                 base_action = ActionType.HOLD
             reasoning_parts.append("Positive news sentiment")
-        elif sentiment == SentimentIndicator.NEGATIVE:
-            if base_action == ActionType.SELL:
+        elif sentiment is SentimentIndicator.NEGATIVE:
+            if base_action is ActionType.SELL:
                 base_confidence = min(base_confidence + 0.2, 1.0)
-            elif base_action == ActionType.BUY:
+            elif base_action is ActionType.BUY:
                 base_confidence = max(base_confidence - 0.2, 0.1)
                 base_action = ActionType.HOLD
             reasoning_parts.append("Negative news sentiment")
         
         # Consider holding performance
-        if holding and holding.get('gain_loss_percent') is not None:
-            gain_loss_percent = holding['gain_loss_percent']
-            if gain_loss_percent > 20:
+        if holding and holding.gain_loss_percent is not None:
+            gain_loss_percent = holding.gain_loss_percent
+            if gain_loss_percent > LARGE_POSITION_GAIN_LOSS_PERCENT:
                 reasoning_parts.append(f"You have {gain_loss_percent:.1f}% gains")
-                if base_action == ActionType.BUY:
+                if base_action is ActionType.BUY:
                     base_action = ActionType.HOLD
                     base_confidence = max(base_confidence - 0.1, 0.3)
-            elif gain_loss_percent < -20:
+            elif gain_loss_percent < -LARGE_POSITION_GAIN_LOSS_PERCENT:
                 reasoning_parts.append(f"You have {abs(gain_loss_percent):.1f}% losses")
         
         reasoning = ". ".join(reasoning_parts) + "."
@@ -332,23 +601,37 @@ class PortfolioAnalyzer:
         return base_action, base_confidence, reasoning
     
     def update_portfolio_with_market_data(self, portfolio: PortfolioData) -> PortfolioData:
-        symbols = [holding['symbol'] for holding in portfolio['holdings']]
+        holdings = portfolio['holdings']
+        symbols = [holding.symbol for holding in holdings]
         market_data_dict = self.yahoo_manager.get_multiple_market_data(symbols)
         
-        total_value = 0.0
-        total_gain_loss = 0.0
-        
-        for holding in portfolio['holdings']:
-            symbol = holding['symbol']
-            if symbol in market_data_dict:
-                market_data = market_data_dict[symbol]
-                holding['current_price'] = market_data['price']
-                holding['value'] = holding['quantity'] * market_data['price']
-                holding['gain_loss'] = (market_data['price'] - holding['avg_cost']) * holding['quantity']
-                holding['gain_loss_percent'] = ((market_data['price'] - holding['avg_cost']) / holding['avg_cost']) * 100
-                
-                total_value += holding['value']
-                total_gain_loss += holding['gain_loss']
+        # Compute per-holding values as arrays; holdings without market data get a NaN price
+        count = len(holdings)
+        quantity = np.fromiter((holding.quantity for holding in holdings), dtype=np.float64, count=count)
+        avg_cost = np.fromiter((holding.avg_cost for holding in holdings), dtype=np.float64, count=count)
+        price = np.fromiter(
+            (market_data_dict[symbol]['price'] if symbol in market_data_dict else np.nan for symbol in symbols),
+            dtype=np.float64,
+            count=count
+        )
+        priced = ~np.isnan(price)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value = quantity * price
+            gain_loss = (price - avg_cost) * quantity
+            gain_loss_percent = ((price - avg_cost) / avg_cost) * 100
+        
+        for holding, is_priced, holding_price, holding_value, holding_gain_loss, holding_gain_loss_percent in zip(
+            holdings, priced.tolist(), price.tolist(), value.tolist(), gain_loss.tolist(), gain_loss_percent.tolist()
+        ):
+            if is_priced:
+                holding.current_price = holding_price
+                holding.value = holding_value
+                holding.gain_loss = holding_gain_loss
+                holding.gain_loss_percent = holding_gain_loss_percent
+        
+        total_value = float(value[priced].sum())
+        total_gain_loss = float(gain_loss[priced].sum())
         
         portfolio['total_value'] = total_value
         portfolio['total_gain_loss'] = total_gain_loss